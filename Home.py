@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import json
+import numpy as np
 
 st.set_page_config(
     page_icon="✈️",
@@ -14,400 +14,521 @@ def load_data(file_path):
     """Load pre-aggregated data from CSV."""
     return pd.read_csv(file_path)
 
-@st.cache_data
-def load_geojson(file_path):
-    """Load GeoJSON data."""
-    with open(file_path) as f:
-        return json.load(f)
+def downsample_lttb(df, x, y, n_out=2000):
+    """Reduce a line series to n_out rows with Largest-Triangle-Three-Buckets."""
+    n = len(df)
+    if n <= n_out or n_out < 3:
+        return df
+    xs = df[x].to_numpy().astype("float64")
+    ys = df[y].to_numpy(dtype="float64")
+
+    # Always keep the first and last points; pick one point from each bucket in between
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = xs[end:next_end].mean(), ys[end:next_end].mean()
+        prev_x, prev_y = xs[keep[i]], ys[keep[i]]
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((prev_x - next_x) * (ys[start:end] - prev_y) - (prev_x - xs[start:end]) * (next_y - prev_y))
+        keep[i + 1] = start + int(area.argmax())
+    return df.iloc[keep]
 
 # Sidebar for Year Selection
 st.sidebar.header("Year Selection")
 years = [str(year) for year in range(2009, 2019)]  # List of available years (based on folder structure)
 selected_year = st.sidebar.selectbox("Select a Year:", years)
 
-# Function to load yearly datasets dynamically
-@st.cache_data
-def load_yearly_data(year, file_name):
-    """Load dataset for the selected year."""
-    file_path = f"datasets/AGG_Datasets/{year}/{file_name}"
-    return pd.read_csv(file_path)
-
-# Load datasets for the selected year
-carrier_delays = load_yearly_data(selected_year, "carrier_delays.csv")
-monthly_aggregates = load_yearly_data(selected_year, "monthly_aggregates.csv")
-state_flight_counts = load_yearly_data(selected_year, "state_flight_counts.csv")
-origin_dest_counts = load_yearly_data(selected_year, "origin_dest_counts.csv")
-airport_delays = load_yearly_data(selected_year, "airport_delays.csv")
-daily_delay_trend = load_yearly_data(selected_year, "daily_delay_trend.csv")
-cancellation_reasons = load_yearly_data(selected_year, "cancellation_reasons.csv")
-distance_vs_delay = load_yearly_data(selected_year, "distance_vs_delay.csv")
-airport_bubble_map = load_yearly_data(selected_year, "airport_bubble_map.csv")
-departure_delay_by_hour = load_yearly_data(selected_year, "departure_delay_by_hour.csv")
-cancellation_percentage_by_carrier = load_yearly_data(selected_year, "cancellation_percentage_by_carrier.csv")
-airlines_most_delays = load_yearly_data(selected_year, "airlines_most_delays.csv")
-state_airport_count = load_yearly_data(selected_year, "state_airport_count.csv")
-origin_state_data = load_yearly_data(selected_year, "origin_state_data.csv")
-destination_state_data = load_yearly_data(selected_year, "destination_state_data.csv")
-taxi_data = load_yearly_data(selected_year, "taxi_times.csv")
-
-# Update title to reflect selected year
-st.header(f"✈️ Flight Delay & Cancellation Analysis Dashboard ({selected_year})")
-
-# Load GeoJSON for US states
-us_states_geojson = load_geojson("datasets/us_states_geojson.json")
-
-# Sidebar filters
-st.sidebar.header("Filters")
-carrier_filter = st.sidebar.multiselect(
-    "Select Carrier(s):",
-    options=carrier_delays["OP_CARRIER"].unique(),
-    default=carrier_delays["OP_CARRIER"].unique()
-)
-
-origin_filter = st.sidebar.multiselect(
-    "Select Origin(s):",
-    options=origin_state_data["State"].unique(),
-    default=origin_state_data["State"].unique()
-)
-
-# Apply filters
-filtered_carrier_delays = carrier_delays[carrier_delays["OP_CARRIER"].isin(carrier_filter)]
-filtered_origin_data = origin_state_data[origin_state_data["State"].isin(origin_filter)]
-
-# Visualization 1: Bar Chart of Number of Airports in Each State
-st.subheader("Bar Chart of Number of Airports in Each State")
-st.info(
-    "The chart illustrates the number of airports per state, with states on the x-axis and airport counts on the y-axis. It uses a Viridis gradient, where lighter colors represent states with higher no of airports, effectively highlighting regional airport distribution."
-)
-fig0 = px.bar(
-    state_airport_count,
-    x="STATE",
-    y="Airport Count",
-    title="Number of Airports in Each State",
-    labels={"STATE": "State", "Airport Count": "Number of Airports"},
-    color="Airport Count",
-    color_continuous_scale="Viridis"
-)
-st.plotly_chart(fig0)
-
-# Visualization 2: Geo Heatmap of Flight Origins by State
-st.subheader("Geo Heatmap")
-st.info(
-    "The chart displays a geo heatmap of flight origins by state in the United States, where states are color-coded based on total flight counts. Lighter colors indicate higher flight activity, offering a clear visualization of regional flight origins and their concentration across the country."
-)
-fig1 = px.choropleth(
-    origin_state_data,
-    locations="State",
-    locationmode="USA-states",
-    color="Origin Count",
-    hover_name="State",
-    hover_data={"Airport Count": True},  # Add airport count to hover data
-    color_continuous_scale="Viridis",
-    scope="usa",
-    geojson=us_states_geojson,
-    labels={"Origin Count": "Total Flight Count"},
-    title="Geo Heatmap of Flight Origins by State"
-)
-
-# Update layout and geo settings for better fit and no background
-fig1.update_geos(
-    visible=True,           
-    projection_type="albers usa", 
+# Columns the sidebar filters on; as categoricals, isin compares integer codes instead of strings
+categorical_columns = ["OP_CARRIER", "State"]
+
+# Yearly datasets and the columns the charts read from each
+yearly_datasets = {
+    "carrier_delays": ["OP_CARRIER", "CARRIER_DELAY", "WEATHER_DELAY", "NAS_DELAY", "SECURITY_DELAY", "LATE_AIRCRAFT_DELAY"],
+    "monthly_aggregates": ["Month", "DEP_DELAY", "ARR_DELAY", "CANCELLED"],
+    "sunburst_origin": ["id", "parent", "value", "color"],
+    "sunburst_dest": ["id", "parent", "value", "color"],
+    "airport_delays": ["ORIGIN", "Average Departure Delay"],
+    "daily_delay_trend": ["FL_DATE", "Average Arrival Delay"],
+    "cancellation_reasons": ["Reason", "Count"],
+    "distance_vs_delay": ["DISTANCE", "ARR_DELAY", "OP_CARRIER", "Count"],
+    "airport_bubble_map": ["ORIGIN", "LATITUDE", "LONGITUDE", "Average Arrival Delay"],
+    "departure_delay_by_hour": ["Hour", "Average Departure Delay"],
+    "cancellation_percentage_by_carrier": ["OP_CARRIER", "Cancellation Rate"],
+    "airlines_most_delays": ["OP_CARRIER", "ARR_DELAY"],
+    "state_airport_count": ["STATE", "Airport Count"],
+    "origin_state_data": ["State", "Origin Count", "Airport Count"],
+    "taxi_times": ["OP_CARRIER", "TAXI_OUT", "TAXI_IN"]
+}
+
+# Geo and layout settings shared by the two US maps (geo heatmap and bubble map)
+map_geos = dict(
+    visible=True,
+    projection_type="albers usa",
     projection_scale=1,
     center={"lat": 38, "lon": -95.7129},
     showcoastlines=True,
     coastlinecolor="Green",
     bgcolor='rgba(0,0,0,0)',
 )
+# Wider map with no white background
+map_layout = dict(width=1200, height=600)
 
-# Update layout to remove white background and increase map width
-fig1.update_layout(
-    width=1200,
-    height=600 
-)
-
-# Show the plot
-st.plotly_chart(fig1)
+# The bar and pie charts have nothing to zoom or pan, so they drop the mode bar but keep their hover labels
+static_chart_config = {"displayModeBar": False}
 
-st.markdown("---")
+# Function to load a yearly dataset
+@st.cache_data
+def load_yearly_data(year, name):
+    """Load dataset for the selected year, reading only the columns its charts use."""
+    # Each aggregate is one dataset partitioned by year; the filter only opens that year's files
+    dataset_path = f"datasets/AGG_Datasets/{name}"
+    df = pd.read_parquet(dataset_path, engine="pyarrow", columns=yearly_datasets[name], filters=[("year", "=", int(year))])
+    for col in df.columns.intersection(categorical_columns):
+        df[col] = df[col].astype("category")
+    return df
+
+# Only the sidebar's datasets are loaded up front; each chart loads its own dataset when it is first built
+carrier_delays = load_yearly_data(selected_year, "carrier_delays")
+origin_state_data = load_yearly_data(selected_year, "origin_state_data")
 
-# Visualization 3: Sunburst Chart of Flight Origin and Destinations by State and Airport
-st.subheader("Sunburst Chart of Flight Counts by State and Airport")
-st.info(
-    "The chart visualizes the breakdown of flight origins by state and airport, with a hierarchical structure. The first level shows the origin state, and the second level details individual airports. The size of each section represents flight count, and the color gradient indicates flight intensity, with lighter sections signifying higher activity. This chart provides a detailed view of flight distribution, highlighting key hubs and regions with significant flight traffic."
-)
-cleaned_sunbrust = origin_dest_counts.dropna(subset=["ORIGIN_STATE", "ORIGIN","DEST_STATE","DEST"])
-
-fig_origin = px.sunburst(
-    cleaned_sunbrust,
-    path=["ORIGIN_STATE", "ORIGIN"],  # Path for hierarchy: State -> Airport
-    values="Flight Count",  # Values represent the flight count
-    title="Flight Origins Breakdown by State and Airport",
-    color="Flight Count",
-    color_continuous_scale="Viridis"
-)
-st.plotly_chart(fig_origin)
+# Update title to reflect selected year
+st.header(f"✈️ Flight Delay & Cancellation Analysis Dashboard ({selected_year})")
 
-st.info(
-    "The chart for flight destinations shows a hierarchical breakdown of flights by destination state and airport. The first level represents the destination state, while the second level breaks it down by individual airports. The size of each segment corresponds to the number of flights, with a color gradient indicating flight count intensity—lighter sections represent higher volumes. This visualization offers an in-depth look at the distribution of flights, highlighting major destinations and the scale of travel to each location."
-)
-# Sunburst Chart for Destinations
-fig_dest = px.sunburst(
-    cleaned_sunbrust,
-    path=["DEST_STATE", "DEST"],  # Path for hierarchy: State -> Airport
-    values="Flight Count",  # Values represent the flight count
-    title="Flight Destinations Breakdown by State and Airport",
-    color="Flight Count",
-    color_continuous_scale="Cividis"
+# Sidebar filters; each option list is computed once and used for both options and defaults
+st.sidebar.header("Filters")
+carriers = carrier_delays["OP_CARRIER"].unique()
+carrier_filter = st.sidebar.multiselect(
+    "Select Carrier(s):",
+    options=carriers,
+    default=carriers
 )
-st.plotly_chart(fig_dest)
 
-# Visualization 4: Bar Graph of Average Delays by Carrier
-st.subheader("Bar Graph of Average Delays by Carrier")
-st.info(
-    "The graph presents a stacked comparison of delay types (Carrier, Weather, NAS, Security, and Late Aircraft delays) for different airlines. Each bar represents an airline, with segments showing the average delay time for each category. This chart allows for a clear comparison of the contributions of each delay type to the total delay time for each carrier."
-)
-fig3 = px.bar(
-    filtered_carrier_delays,
-    x="OP_CARRIER",
-    y=["CARRIER_DELAY", "WEATHER_DELAY", "NAS_DELAY", "SECURITY_DELAY", "LATE_AIRCRAFT_DELAY"],
-    title="Average Delays by Carrier",
-    labels={"value": "Average Delay (minutes)", "variable": "Delay Type"},
-    barmode="stack"
+origin_states = origin_state_data["State"].unique()
+origin_filter = st.sidebar.multiselect(
+    "Select Origin(s):",
+    options=origin_states,
+    default=origin_states
 )
-st.plotly_chart(fig3)
 
-# Visualization 5: Pie Chart of Flight Cancellations by Reason
-st.subheader("Pie Chart of Flight Cancellations by Reason")
-st.info(
-    "The chart visualizes the distribution of flight cancellations by cause. Each slice of the pie represents a different reason for cancellations, with the slice size corresponding to the number of cancellations. The reasons are: A for Air Carrier issues, B for Weather conditions, C for National Air System delays, and D for Security concerns."
-)
-fig4 = px.pie(
-    cancellation_reasons,
-    names="Reason",
-    values="Count",
-    title="Flight Cancellations by Reason",
-    hole=0.4,
-    template="plotly_white"
-)
-st.plotly_chart(fig4)
+# Only the selected section is built and sent to the browser; st.tabs would still render every chart
+sections = ["States & Airports", "Delays & Cancellations", "Trends by Time & Carrier"]
+section = st.segmented_control("Section", sections, default=sections[0], label_visibility="collapsed") or sections[0]
 
-# Visualization 6: Bar Graph of Average Departure Delays by Airport
-st.subheader("Bar Graph of Average Departure Delays by Airport")
-st.info(
-    "The graph visualizes the average delay times for departures from different airports. Each bar represents an airport, with the height indicating the average delay in minutes. This chart helps identify airports with longer delays, offering insights into operational challenges or areas for improvement."
-)
-fig5 = px.bar(
-    airport_delays,
-    x="ORIGIN",
-    y="Average Departure Delay",
-    title="Average Departure Delays by Airport",
-    labels={"Average Departure Delay": "Delay (minutes)", "ORIGIN": "Origin Airport"}
-)
-st.plotly_chart(fig5)
-
-# Visualization 7: Scatter Plot of Distance vs. Delay
-st.subheader("Scatter Plot of Distance vs. Delay")
-st.info(
-    "The plot illustrates the relationship between flight distance and arrival delay. Each point represents a flight, with the horizontal axis showing distance in miles and the vertical axis showing arrival delay in minutes. Points are color-coded by carrier, allowing users to distinguish delays by different airlines. This visualization helps identify trends, such as whether longer flights have more significant delays or if specific carriers experience longer delays over certain distances."
-)
-fig6 = px.scatter(
-    distance_vs_delay,
-    x="DISTANCE",
-    y="ARR_DELAY",
-    color="OP_CARRIER",
-    title="Distance vs. Arrival Delay",
-    labels={"DISTANCE": "Distance (miles)", "ARR_DELAY": "Arrival Delay (minutes)"}
-)
-st.plotly_chart(fig6)
+if section == "States & Airports":
+    # Visualization 1: Bar Chart of Number of Airports in Each State
+    st.subheader("Bar Chart of Number of Airports in Each State")
+    st.info(
+        "The chart illustrates the number of airports per state, with states on the x-axis and airport counts on the y-axis. It uses a Viridis gradient, where lighter colors represent states with higher no of airports, effectively highlighting regional airport distribution."
+    )
 
-# Ensure all size values in the bubble map are non-negative
-airport_bubble_map["Average Arrival Delay"] = airport_bubble_map["Average Arrival Delay"].clip(lower=0)
+    @st.cache_data
+    def make_fig0(year):
+        """Build the airports-per-state bar chart."""
+        state_airport_count = load_yearly_data(year, "state_airport_count")
+        fig0 = go.Figure(go.Bar(
+            x=state_airport_count["STATE"],
+            y=state_airport_count["Airport Count"],
+            marker=dict(color=state_airport_count["Airport Count"], colorscale="Viridis", showscale=True, colorbar=dict(title="Number of Airports")),
+            hovertemplate='State: %{x}<br>Number of Airports: %{y}<extra></extra>'
+        ))
+        fig0.update_layout(title="Number of Airports in Each State", xaxis_title="State", yaxis_title="Number of Airports")
+        return fig0
+
+    st.plotly_chart(make_fig0(selected_year), config=static_chart_config)
+
+    # Visualization 2: Geo Heatmap of Flight Origins by State
+    st.subheader("Geo Heatmap")
+    st.info(
+        "The chart displays a geo heatmap of flight origins by state in the United States, where states are color-coded based on total flight counts. Lighter colors indicate higher flight activity, offering a clear visualization of regional flight origins and their concentration across the country."
+    )
 
-# Visualization 8: Bubble Map of Arrival Delays by Airport in the US
-st.subheader("Bubble Map of Arrival Delays by Airport in the US")
-st.info(
-    "The map shows the distribution of average arrival delays across airports in the US. Each airport is represented by a bubble, with the bubble size proportional to the average arrival delay, and the color indicating the delay magnitude. This visualization highlights regional patterns in delays, making it easy to identify airports with higher or lower average arrival delays."
-)
-fig7 = px.scatter_geo(
-    airport_bubble_map,
-    lat="LATITUDE",
-    lon="LONGITUDE",
-    size="Average Arrival Delay",
-    color="Average Arrival Delay",
-    hover_name='ORIGIN', 
-    size_max=10,    
-    title="Arrival Delays by Airport in the US",
-    scope="usa",
-    color_continuous_scale="Viridis",
-    template='plotly_white'
-)
-fig7.update_geos(
-    visible=True,           
-    projection_type="albers usa", 
-    projection_scale=1,
-    center={"lat": 38, "lon": -95.7129},
-    showcoastlines=True,
-    coastlinecolor="Green",
-    bgcolor='rgba(0,0,0,0)',
-)
+    @st.cache_data
+    def make_fig1(year):
+        """Build the geo heatmap of flight origins by state."""
+        origin_state_data = load_yearly_data(year, "origin_state_data")
+        fig1 = px.choropleth(
+            origin_state_data,
+            locations="State",
+            locationmode="USA-states",  # States are drawn from Plotly's built-in US map, so no GeoJSON is embedded
+            color="Origin Count",
+            hover_name="State",
+            hover_data={"Airport Count": True},  # Add airport count to hover data
+            color_continuous_scale="Viridis",
+            scope="usa",
+            labels={"Origin Count": "Total Flight Count"},
+            title="Geo Heatmap of Flight Origins by State"
+        )
+
+        # Update layout and geo settings for better fit and no background
+        fig1.update_geos(**map_geos)
+        fig1.update_layout(**map_layout)
+        return fig1
+
+    st.plotly_chart(make_fig1(selected_year))
+
+    st.markdown("---")
+
+    # Visualization 3: Sunburst Chart of Flight Origin and Destinations by State and Airport
+    st.subheader("Sunburst Chart of Flight Counts by State and Airport")
+    st.info(
+        "The chart visualizes the breakdown of flight origins by state and airport, with a hierarchical structure. The first level shows the origin state, and the second level details individual airports. The size of each section represents flight count, and the color gradient indicates flight intensity, with lighter sections signifying higher activity. This chart provides a detailed view of flight distribution, highlighting key hubs and regions with significant flight traffic."
+    )
 
-# Update layout to remove white background and increase map width
-fig7.update_layout(
-    width=1200,
-    height=600 
-)
+    @st.cache_data
+    def make_fig_origin(year):
+        """Build the sunburst of flight origins by state and airport."""
+        sunburst_origin = load_yearly_data(year, "sunburst_origin")
+
+        # The state -> airport hierarchy is rolled up at aggregation time
+        fig_origin = go.Figure(go.Sunburst(
+            ids=sunburst_origin["id"],
+            labels=sunburst_origin["id"],
+            parents=sunburst_origin["parent"],
+            values=sunburst_origin["value"],  # Values represent the flight count
+            branchvalues="total",
+            marker=dict(colors=sunburst_origin["color"], colorscale="Viridis", showscale=True, colorbar=dict(title="Flight Count")),
+            hovertemplate='%{label}<br>Flight Count: %{value}<extra></extra>'
+        ))
+        fig_origin.update_layout(title="Flight Origins Breakdown by State and Airport")
+        return fig_origin
+
+    st.plotly_chart(make_fig_origin(selected_year))
+
+    st.info(
+        "The chart for flight destinations shows a hierarchical breakdown of flights by destination state and airport. The first level represents the destination state, while the second level breaks it down by individual airports. The size of each segment corresponds to the number of flights, with a color gradient indicating flight count intensity—lighter sections represent higher volumes. This visualization offers an in-depth look at the distribution of flights, highlighting major destinations and the scale of travel to each location."
+    )
 
+    @st.cache_data
+    def make_fig_dest(year):
+        """Build the sunburst of flight destinations by state and airport."""
+        sunburst_dest = load_yearly_data(year, "sunburst_dest")
+
+        # Sunburst Chart for Destinations
+        fig_dest = go.Figure(go.Sunburst(
+            ids=sunburst_dest["id"],
+            labels=sunburst_dest["id"],
+            parents=sunburst_dest["parent"],
+            values=sunburst_dest["value"],  # Values represent the flight count
+            branchvalues="total",
+            marker=dict(colors=sunburst_dest["color"], colorscale="Cividis", showscale=True, colorbar=dict(title="Flight Count")),
+            hovertemplate='%{label}<br>Flight Count: %{value}<extra></extra>'
+        ))
+        fig_dest.update_layout(title="Flight Destinations Breakdown by State and Airport")
+        return fig_dest
+
+    st.plotly_chart(make_fig_dest(selected_year))
+
+if section == "Delays & Cancellations":
+    # Visualization 4: Bar Graph of Average Delays by Carrier
+    st.subheader("Bar Graph of Average Delays by Carrier")
+    st.info(
+        "The graph presents a stacked comparison of delay types (Carrier, Weather, NAS, Security, and Late Aircraft delays) for different airlines. Each bar represents an airline, with segments showing the average delay time for each category. This chart allows for a clear comparison of the contributions of each delay type to the total delay time for each carrier."
+    )
 
-st.plotly_chart(fig7)
+    @st.cache_data
+    def make_fig3(year, carriers):
+        """Build the stacked bar of average delays for the selected carriers."""
+        carrier_delays = load_yearly_data(year, "carrier_delays")
+        filtered_carrier_delays = carrier_delays[carrier_delays["OP_CARRIER"].isin(carriers)]
+        # One trace per delay type straight from the wide frame, without melting it to long form
+        delay_columns = ["CARRIER_DELAY", "WEATHER_DELAY", "NAS_DELAY", "SECURITY_DELAY", "LATE_AIRCRAFT_DELAY"]
+        fig3 = go.Figure([
+            go.Bar(name=col, x=filtered_carrier_delays["OP_CARRIER"], y=filtered_carrier_delays[col])
+            for col in delay_columns
+        ])
+        fig3.update_layout(
+            title="Average Delays by Carrier",
+            xaxis_title="OP_CARRIER",
+            yaxis_title="Average Delay (minutes)",
+            legend_title="Delay Type",
+            barmode="stack"
+        )
+        return fig3
+
+    # Sorted so the same carriers picked in a different order reuse the cached figure
+    st.plotly_chart(make_fig3(selected_year, tuple(sorted(carrier_filter))), config=static_chart_config)
+
+    # Visualization 5: Pie Chart of Flight Cancellations by Reason
+    st.subheader("Pie Chart of Flight Cancellations by Reason")
+    st.info(
+        "The chart visualizes the distribution of flight cancellations by cause. Each slice of the pie represents a different reason for cancellations, with the slice size corresponding to the number of cancellations. The reasons are: A for Air Carrier issues, B for Weather conditions, C for National Air System delays, and D for Security concerns."
+    )
 
-# Visualization 9: Monthly Delays and Cancellations
-st.subheader("Monthly Delays and Cancellations")
-st.info(
-    "The chart presents a line graph tracking the average delays for departures and arrivals, along with flight cancellations, for each month. It features three lines: red for departure delays, blue for arrival delays, and green for cancellations. This chart offers insights into monthly trends, helping identify patterns in delays and cancellations."
-)
-# Create the figure
-fig8 = go.Figure()
-
-# Add trace for Departure Delay
-fig8.add_trace(go.Scatter(
-    x=monthly_aggregates["Month"],
-    y=monthly_aggregates["DEP_DELAY"],
-    mode="lines+markers",
-    name="Departure Delay",
-    line=dict(color='crimson', width=3),
-    marker=dict(size=8, color='crimson', symbol='circle'),
-    hovertemplate='Month: %{x}<br>Departure Delay: %{y} minutes'
-))
-
-# Add trace for Arrival Delay
-fig8.add_trace(go.Scatter(
-    x=monthly_aggregates["Month"],
-    y=monthly_aggregates["ARR_DELAY"],
-    mode="lines+markers",
-    name="Arrival Delay",
-    line=dict(color='royalblue', width=3),
-    marker=dict(size=8, color='royalblue', symbol='circle'),
-    hovertemplate='Month: %{x}<br>Arrival Delay: %{y} minutes'
-))
-
-# Add trace for Cancellations
-fig8.add_trace(go.Scatter(
-    x=monthly_aggregates["Month"],
-    y=monthly_aggregates["CANCELLED"],
-    mode="lines+markers",
-    name="Cancellations",
-    line=dict(color='green', width=3),
-    marker=dict(size=8, color='green', symbol='circle'),
-    hovertemplate='Month: %{x}<br>Cancellations: %{y}'
-))
-
-# Update layout for the figure
-fig8.update_layout(
-    title="Monthly Delays and Cancellations",
-    xaxis_title="Month",
-    yaxis_title="Average Delay (minutes) / Cancellations",
-    template="plotly_dark",
-    hovermode="x unified",   # Hover mode to show data for all traces at once
-    legend_title="Delay Types",
-    legend=dict(x=0.75, y=1),  # Position the legend
-    margin=dict(l=40, r=40, t=40, b=40)  # Adjust margins for better readability
-)
+    @st.cache_data
+    def make_fig4(year):
+        """Build the pie chart of cancellations by reason."""
+        cancellation_reasons = load_yearly_data(year, "cancellation_reasons")
+        fig4 = go.Figure(go.Pie(
+            labels=cancellation_reasons["Reason"],
+            values=cancellation_reasons["Count"],
+            hole=0.4
+        ))
+        fig4.update_layout(title="Flight Cancellations by Reason", template="plotly_white")
+        return fig4
+
+    st.plotly_chart(make_fig4(selected_year), config=static_chart_config)
+
+    # Visualization 6: Bar Graph of Average Departure Delays by Airport
+    st.subheader("Bar Graph of Average Departure Delays by Airport")
+    st.info(
+        "The graph visualizes the average delay times for departures from different airports. Each bar represents an airport, with the height indicating the average delay in minutes. This chart helps identify airports with longer delays, offering insights into operational challenges or areas for improvement."
+    )
 
-# Display the plot in Streamlit
-st.plotly_chart(fig8)
+    @st.cache_data
+    def make_fig5(year):
+        """Build the bar chart of average departure delays by airport."""
+        airport_delays = load_yearly_data(year, "airport_delays")
+        fig5 = go.Figure(go.Bar(
+            x=airport_delays["ORIGIN"],
+            y=airport_delays["Average Departure Delay"],
+            hovertemplate='Origin Airport: %{x}<br>Delay (minutes): %{y}<extra></extra>'
+        ))
+        fig5.update_layout(title="Average Departure Delays by Airport", xaxis_title="Origin Airport", yaxis_title="Delay (minutes)")
+        return fig5
+
+    st.plotly_chart(make_fig5(selected_year), config=static_chart_config)
+
+    # Visualization 7: Scatter Plot of Distance vs. Delay
+    st.subheader("Scatter Plot of Distance vs. Delay")
+    st.info(
+        "The plot illustrates the relationship between flight distance and arrival delay. Each bubble groups flights into 50-mile distance and 5-minute delay bins, with the horizontal axis showing distance in miles, the vertical axis showing arrival delay in minutes, and the bubble size showing the number of flights. Points are color-coded by carrier, allowing users to distinguish delays by different airlines. This visualization helps identify trends, such as whether longer flights have more significant delays or if specific carriers experience longer delays over certain distances."
+    )
 
-# Visualization 10: Scatter Plot of Taxi Out vs Taxi In Times
-st.subheader("Scatter Plot of Taxi Out vs Taxi In Times")
-st.info(
-    "The plot visualizes the relationship between taxi-out time (time taken for the aircraft to leave the gate) and taxi-in time (time taken to return to the gate after landing). Each data point represents a flight, with taxi-out time on the x-axis and taxi-in time on the y-axis. Points are color-coded by carrier. This chart helps identify any correlation between the two variables, such as whether longer taxi-out times are associated with longer taxi-in times."
-)
-fig9 = px.scatter(
-    taxi_data,
-    x="TAXI_OUT",
-    y="TAXI_IN",
-    color="OP_CARRIER",
-    title="Taxi Out vs Taxi In Times",
-    labels={"TAXI_OUT": "Taxi Out Time (minutes)", "TAXI_IN": "Taxi In Time (minutes)"}
-)
-st.plotly_chart(fig9)
+    @st.cache_data
+    def make_fig6(year):
+        """Build the distance vs. arrival delay bubble scatter."""
+        distance_vs_delay = load_yearly_data(year, "distance_vs_delay")
+        fig6 = px.scatter(
+            distance_vs_delay,
+            x="DISTANCE",
+            y="ARR_DELAY",
+            color="OP_CARRIER",
+            size="Count",  # Bubble size is the number of flights in each distance/delay bin
+            title="Distance vs. Arrival Delay",
+            labels={"DISTANCE": "Distance (miles)", "ARR_DELAY": "Arrival Delay (minutes)", "Count": "Flights"},
+            render_mode="webgl"  # Draw points with WebGL instead of SVG
+        )
+        return fig6
+
+    st.plotly_chart(make_fig6(selected_year))
+
+    # Visualization 8: Bubble Map of Arrival Delays by Airport in the US
+    st.subheader("Bubble Map of Arrival Delays by Airport in the US")
+    st.info(
+        "The map shows the distribution of average arrival delays across airports in the US. Each airport is represented by a bubble, with the bubble size proportional to the average arrival delay, and the color indicating the delay magnitude. This visualization highlights regional patterns in delays, making it easy to identify airports with higher or lower average arrival delays."
+    )
 
-# Visualization 11: Bar Graph of Average Departure Delay by Time of Day
-st.subheader("Bar Graph of Average Departure Delay by Time of Day")
-st.info(
-    "The graph shows the relationship between the hour of the day and the average departure delay. The x-axis represents different hours, and the y-axis displays the average departure delay in minutes. Each bar indicates the average delay for flights departing at a specific hour. This chart helps identify trends, such as whether delays are more frequent during certain times of the day, offering valuable insights for analyzing peak delay times."
-)
-fig10 = px.bar(
-    departure_delay_by_hour,
-    x="Hour",
-    y="Average Departure Delay",
-    title="Average Departure Delay by Time of Day",
-    labels={"Hour": "Hour of Day", "Average Departure Delay": "Delay (minutes)"}
-)
-st.plotly_chart(fig10)
+    @st.cache_data
+    def make_fig7(year):
+        """Build the bubble map of arrival delays by airport."""
+        # Delays are clipped to be non-negative at aggregation time, so they can size the bubbles directly
+        airport_bubble_map = load_yearly_data(year, "airport_bubble_map")
+
+        fig7 = px.scatter_geo(
+            airport_bubble_map,
+            lat="LATITUDE",
+            lon="LONGITUDE",
+            size="Average Arrival Delay",
+            color="Average Arrival Delay",
+            hover_name='ORIGIN', 
+            size_max=10,    
+            title="Arrival Delays by Airport in the US",
+            scope="usa",
+            color_continuous_scale="Viridis",
+            template='plotly_white'
+        )
+        fig7.update_geos(**map_geos)
+        fig7.update_layout(**map_layout)
+        return fig7
+
+    st.plotly_chart(make_fig7(selected_year))
+
+if section == "Trends by Time & Carrier":
+    # Visualization 9: Monthly Delays and Cancellations
+    st.subheader("Monthly Delays and Cancellations")
+    st.info(
+        "The chart presents a line graph tracking the average delays for departures and arrivals, along with flight cancellations, for each month. It features three lines: red for departure delays, blue for arrival delays, and green for cancellations. This chart offers insights into monthly trends, helping identify patterns in delays and cancellations."
+    )
 
-# Visualization 12: Bar Graph of Cancellations Percentage by Carrier
-st.subheader("Bar Graph of Cancellations Percentage by Carrier")
-st.info(
-    "The graph shows the percentage of cancellations for each airline carrier. The x-axis represents different carriers, and the y-axis displays the cancellation rate as a percentage. Each bar is color-coded according to the cancellation rate, with the color scale indicating the magnitude. This visualization enables easy comparison of cancellation rates across carriers, highlighting those with higher or lower cancellation percentages and providing insights for identifying patterns and potential areas of improvement in the airline industry."
-)
-fig11 = px.bar(
-    cancellation_percentage_by_carrier,
-    x="OP_CARRIER",
-    y="Cancellation Rate",
-    title="Cancellations Percentage by Carrier",
-    labels={"Cancellation Rate": "Rate (%)", "OP_CARRIER": "Carrier"},
-    color="Cancellation Rate",
-    color_continuous_scale="Viridis"
-)
-st.plotly_chart(fig11)
+    @st.cache_data
+    def make_fig8(year):
+        """Build the monthly delays and cancellations line chart."""
+        monthly_aggregates = load_yearly_data(year, "monthly_aggregates")
+        # Create the figure
+        fig8 = go.Figure()
+
+        # Add trace for Departure Delay
+        fig8.add_trace(go.Scatter(
+            x=monthly_aggregates["Month"],
+            y=monthly_aggregates["DEP_DELAY"],
+            mode="lines+markers",
+            name="Departure Delay",
+            line=dict(color='crimson', width=3),
+            marker=dict(size=8, color='crimson', symbol='circle'),
+            hovertemplate='Month: %{x|%b %Y}<br>Departure Delay: %{y} minutes'
+        ))
+
+        # Add trace for Arrival Delay
+        fig8.add_trace(go.Scatter(
+            x=monthly_aggregates["Month"],
+            y=monthly_aggregates["ARR_DELAY"],
+            mode="lines+markers",
+            name="Arrival Delay",
+            line=dict(color='royalblue', width=3),
+            marker=dict(size=8, color='royalblue', symbol='circle'),
+            hovertemplate='Month: %{x|%b %Y}<br>Arrival Delay: %{y} minutes'
+        ))
+
+        # Add trace for Cancellations
+        fig8.add_trace(go.Scatter(
+            x=monthly_aggregates["Month"],
+            y=monthly_aggregates["CANCELLED"],
+            mode="lines+markers",
+            name="Cancellations",
+            line=dict(color='green', width=3),
+            marker=dict(size=8, color='green', symbol='circle'),
+            hovertemplate='Month: %{x|%b %Y}<br>Cancellations: %{y}'
+        ))
+
+        # Update layout for the figure
+        fig8.update_layout(
+            title="Monthly Delays and Cancellations",
+            xaxis_title="Month",
+            yaxis_title="Average Delay (minutes) / Cancellations",
+            template="plotly_dark",
+            hovermode="x unified",   # Hover mode to show data for all traces at once
+            legend_title="Delay Types",
+            legend=dict(x=0.75, y=1),  # Position the legend
+            margin=dict(l=40, r=40, t=40, b=40)  # Adjust margins for better readability
+        )
+        return fig8
+
+    st.plotly_chart(make_fig8(selected_year))
+
+    # Visualization 10: Scatter Plot of Taxi Out vs Taxi In Times
+    st.subheader("Scatter Plot of Taxi Out vs Taxi In Times")
+    st.info(
+        "The plot visualizes the relationship between taxi-out time (time taken for the aircraft to leave the gate) and taxi-in time (time taken to return to the gate after landing). Each data point represents a flight, with taxi-out time on the x-axis and taxi-in time on the y-axis. Points are color-coded by carrier. This chart helps identify any correlation between the two variables, such as whether longer taxi-out times are associated with longer taxi-in times."
+    )
 
-# Visualization 13: Horizontal Bar Graph of Airlines with the Most Delays
-st.subheader("Horizontal Bar Graph of Airlines with the Most Delays")
-st.info(
-    "The graph shows the airlines with the highest arrival delays. The x-axis represents arrival delay in minutes, while the y-axis lists the airlines. Each bar represents an airline, with the length corresponding to the average arrival delay. Bars are color-coded based on delay duration, with the color scale indicating the severity of delays. This visualization makes it easy to identify which airlines experience the most delays, offering insights into performance and potential areas for improvement."
-)
-fig12 = px.bar(
-    airlines_most_delays,
-    x="ARR_DELAY",
-    y="OP_CARRIER",
-    orientation="h",
-    title="Airlines with the Most Delays",
-    labels={"ARR_DELAY": "Arrival Delay (minutes)", "OP_CARRIER": "Airline"},
-    color="ARR_DELAY",
-    color_continuous_scale="Viridis"
-)
-st.plotly_chart(fig12)
+    @st.cache_data
+    def make_fig9(year):
+        """Build the taxi-out vs. taxi-in scatter."""
+        taxi_data = load_yearly_data(year, "taxi_times")
+        fig9 = px.scatter(
+            taxi_data,
+            x="TAXI_OUT",
+            y="TAXI_IN",
+            color="OP_CARRIER",
+            title="Taxi Out vs Taxi In Times",
+            labels={"TAXI_OUT": "Taxi Out Time (minutes)", "TAXI_IN": "Taxi In Time (minutes)"}
+        )
+        return fig9
+
+    st.plotly_chart(make_fig9(selected_year))
+
+    # Visualization 11: Bar Graph of Average Departure Delay by Time of Day
+    st.subheader("Bar Graph of Average Departure Delay by Time of Day")
+    st.info(
+        "The graph shows the relationship between the hour of the day and the average departure delay. The x-axis represents different hours, and the y-axis displays the average departure delay in minutes. Each bar indicates the average delay for flights departing at a specific hour. This chart helps identify trends, such as whether delays are more frequent during certain times of the day, offering valuable insights for analyzing peak delay times."
+    )
 
-# Visualization 14: Line Plot of Trend of Average Arrival Delay Over Time
-st.subheader("Line Plot of Trend of Average Arrival Delay Over Time")
-st.info(
-    "The plot visualizes how the average arrival delay has changed over time. The x-axis represents flight dates, and the y-axis shows the average arrival delay in minutes. Each data point corresponds to the average delay for a specific day, with lines connecting the points to highlight the trend. A range slider at the bottom lets users zoom into specific time frames, such as the past month, six months, or year. This chart helps identify trends in delays and track the impact of interventions or seasonal variations."
-)
+    @st.cache_data
+    def make_fig10(year):
+        """Build the bar chart of average departure delay by hour."""
+        departure_delay_by_hour = load_yearly_data(year, "departure_delay_by_hour")
+        fig10 = go.Figure(go.Bar(
+            x=departure_delay_by_hour["Hour"],
+            y=departure_delay_by_hour["Average Departure Delay"],
+            hovertemplate='Hour of Day: %{x}<br>Delay (minutes): %{y}<extra></extra>'
+        ))
+        fig10.update_layout(title="Average Departure Delay by Time of Day", xaxis_title="Hour of Day", yaxis_title="Delay (minutes)")
+        return fig10
+
+    st.plotly_chart(make_fig10(selected_year), config=static_chart_config)
+
+    # Visualization 12: Bar Graph of Cancellations Percentage by Carrier
+    st.subheader("Bar Graph of Cancellations Percentage by Carrier")
+    st.info(
+        "The graph shows the percentage of cancellations for each airline carrier. The x-axis represents different carriers, and the y-axis displays the cancellation rate as a percentage. Each bar is color-coded according to the cancellation rate, with the color scale indicating the magnitude. This visualization enables easy comparison of cancellation rates across carriers, highlighting those with higher or lower cancellation percentages and providing insights for identifying patterns and potential areas of improvement in the airline industry."
+    )
 
-daily_delay_trend['FL_DATE'] = pd.to_datetime(daily_delay_trend['FL_DATE'])
+    @st.cache_data
+    def make_fig11(year):
+        """Build the bar chart of cancellation rates by carrier."""
+        cancellation_percentage_by_carrier = load_yearly_data(year, "cancellation_percentage_by_carrier")
+        fig11 = go.Figure(go.Bar(
+            x=cancellation_percentage_by_carrier["OP_CARRIER"],
+            y=cancellation_percentage_by_carrier["Cancellation Rate"],
+            marker=dict(color=cancellation_percentage_by_carrier["Cancellation Rate"], colorscale="Viridis", showscale=True, colorbar=dict(title="Rate (%)")),
+            hovertemplate='Carrier: %{x}<br>Rate (%): %{y}<extra></extra>'
+        ))
+        fig11.update_layout(title="Cancellations Percentage by Carrier", xaxis_title="Carrier", yaxis_title="Rate (%)")
+        return fig11
+
+    st.plotly_chart(make_fig11(selected_year), config=static_chart_config)
+
+    # Visualization 13: Horizontal Bar Graph of Airlines with the Most Delays
+    st.subheader("Horizontal Bar Graph of Airlines with the Most Delays")
+    st.info(
+        "The graph shows the airlines with the highest arrival delays. The x-axis represents arrival delay in minutes, while the y-axis lists the airlines. Each bar represents an airline, with the length corresponding to the average arrival delay. Bars are color-coded based on delay duration, with the color scale indicating the severity of delays. This visualization makes it easy to identify which airlines experience the most delays, offering insights into performance and potential areas for improvement."
+    )
 
-fig13 = px.line(
-    daily_delay_trend,
-    x="FL_DATE",
-    y="Average Arrival Delay",
-    title="Trend of Average Arrival Delay Over Time",
-    labels={"FL_DATE": "Date", "Average Arrival Delay": "Delay (minutes)"},
-    template="plotly_dark"
-)
-fig13.update_layout(
-    xaxis=dict(
-        rangeslider=dict(visible=True),
-        rangeselector=dict(
-            buttons=list([
-                dict(count=1, label="1m", step="month", stepmode="backward"),
-                dict(count=6, label="6m", step="month", stepmode="backward"),
-                dict(count=1, label="1y", step="year", stepmode="backward"),
-                dict(step="all")
-            ])
-        ),
-        type="date"  # Ensure x-axis is recognized as a date type
+    @st.cache_data
+    def make_fig12(year):
+        """Build the horizontal bar chart of airlines with the most delays."""
+        airlines_most_delays = load_yearly_data(year, "airlines_most_delays")
+        fig12 = go.Figure(go.Bar(
+            x=airlines_most_delays["ARR_DELAY"],
+            y=airlines_most_delays["OP_CARRIER"],
+            orientation="h",
+            marker=dict(color=airlines_most_delays["ARR_DELAY"], colorscale="Viridis", showscale=True, colorbar=dict(title="Arrival Delay (minutes)")),
+            hovertemplate='Arrival Delay (minutes): %{x}<br>Airline: %{y}<extra></extra>'
+        ))
+        fig12.update_layout(title="Airlines with the Most Delays", xaxis_title="Arrival Delay (minutes)", yaxis_title="Airline")
+        return fig12
+
+    st.plotly_chart(make_fig12(selected_year), config=static_chart_config)
+
+    # Visualization 14: Line Plot of Trend of Average Arrival Delay Over Time
+    st.subheader("Line Plot of Trend of Average Arrival Delay Over Time")
+    st.info(
+        "The plot visualizes how the average arrival delay has changed over time. The x-axis represents flight dates, and the y-axis shows the average arrival delay in minutes. Each data point corresponds to the average delay for a specific day, with lines connecting the points to highlight the trend. A range slider at the bottom lets users zoom into specific time frames, such as the past month, six months, or year. This chart helps identify trends in delays and track the impact of interventions or seasonal variations."
     )
-)
-fig13.update_traces(mode='lines+markers', hovertemplate='Date: %{x}<br>Avg Delay: %{y:.2f} mins')
-st.plotly_chart(fig13)
+
+    @st.cache_data
+    def make_fig13(year):
+        """Build the daily average arrival delay trend line."""
+        # FL_DATE is stored as a timestamp, so it reads back from Parquet as datetime64 without parsing
+        daily_delay_trend = load_yearly_data(year, "daily_delay_trend")
+
+        # Keep the line light for the browser if the series grows beyond one point per day of a year
+        fig13 = px.line(
+            downsample_lttb(daily_delay_trend, "FL_DATE", "Average Arrival Delay"),
+            x="FL_DATE",
+            y="Average Arrival Delay",
+            title="Trend of Average Arrival Delay Over Time",
+            labels={"FL_DATE": "Date", "Average Arrival Delay": "Delay (minutes)"},
+            template="plotly_dark"
+        )
+        fig13.update_layout(
+            xaxis=dict(
+                rangeslider=dict(visible=True),
+                rangeselector=dict(
+                    buttons=list([
+                        dict(count=1, label="1m", step="month", stepmode="backward"),
+                        dict(count=6, label="6m", step="month", stepmode="backward"),
+                        dict(count=1, label="1y", step="year", stepmode="backward"),
+                        dict(step="all")
+                    ])
+                ),
+                type="date"  # Ensure x-axis is recognized as a date type
+            )
+        )
+        fig13.update_traces(mode='lines+markers', hovertemplate='Date: %{x}<br>Avg Delay: %{y:.2f} mins')
+        return fig13
+
+    st.plotly_chart(make_fig13(selected_year))
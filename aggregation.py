@@ -1,5 +1,9 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
 
 # Define the input and output directories
 input_dir = "datasets/archive/"  # Folder containing all CSV files
@@ -17,77 +21,165 @@ fill_values = {
     "TAXI_OUT": 0
 }
 
+# Columns of the raw flight data used by the aggregations, with their types
+raw_column_types = {
+    "FL_DATE": pa.timestamp("s"),
+    "CRS_DEP_TIME": pa.int16(),
+    "OP_CARRIER": pa.string(),
+    "ORIGIN": pa.string(),
+    "DEST": pa.string(),
+    "DEP_DELAY": pa.float32(),
+    "ARR_DELAY": pa.float32(),
+    "CANCELLED": pa.float64(),
+    "CANCELLATION_CODE": pa.string(),
+    "CARRIER_DELAY": pa.float32(),
+    "WEATHER_DELAY": pa.float32(),
+    "NAS_DELAY": pa.float32(),
+    "SECURITY_DELAY": pa.float32(),
+    "LATE_AIRCRAFT_DELAY": pa.float32(),
+    "DISTANCE": pa.float64(),
+    "TAXI_IN": pa.float64(),
+    "TAXI_OUT": pa.float64()
+}
+
+# Only parse the needed columns; empty strings (e.g. CANCELLATION_CODE) become nulls
+convert_options = pv.ConvertOptions(
+    include_columns=list(raw_column_types),
+    column_types=raw_column_types,
+    timestamp_parsers=["%Y-%m-%d"],
+    strings_can_be_null=True
+)
+
 # Load auxiliary airport data
 airports_file = "datasets/airports.csv"
-airports = pd.read_csv(airports_file)
-airports = airports[['IATA', 'STATE', 'LATITUDE', 'LONGITUDE']]
-airports_dict = airports.set_index("IATA")
+airports = pd.read_csv(airports_file, usecols=['IATA', 'STATE', 'LATITUDE', 'LONGITUDE'])
+
+# Lookup tables for joining airport metadata onto origin and destination airports
+origin_lookup = airports.rename(columns={"IATA": "ORIGIN", "STATE": "ORIGIN_STATE"})
+dest_lookup = airports.rename(columns={"IATA": "DEST", "STATE": "DEST_STATE"})[["DEST", "DEST_STATE"]]
+
+# Airport code -> state, for tagging every flight with its origin and destination state
+state_by_iata = airports.set_index("IATA")["STATE"]
+state_dtype = pd.CategoricalDtype(sorted(airports["STATE"].dropna().unique()))
+
+# Function to roll flight counts up into a state -> airport sunburst hierarchy
+def build_sunburst(counts, state_col, airport_col):
+    # Like px.sunburst with color == values, every segment is colored by the count-weighted mean of its route counts
+    routes = counts[[state_col, airport_col]].assign(
+        count=counts["Flight Count"], squared=counts["Flight Count"].astype("float64") ** 2
+    )
+    airport_counts = routes.groupby([state_col, airport_col], observed=True)[["count", "squared"]].sum().reset_index()
+    states = routes.groupby(state_col, observed=True)[["count", "squared"]].sum().reset_index()
+    return pd.concat([
+        pd.DataFrame({
+            "id": states[state_col],
+            "parent": "",
+            "value": states["count"],
+            "color": states["squared"] / states["count"]
+        }),
+        pd.DataFrame({
+            "id": airport_counts[airport_col],
+            "parent": airport_counts[state_col],
+            "value": airport_counts["count"],
+            "color": airport_counts["squared"] / airport_counts["count"]
+        })
+    ], ignore_index=True)
 
 # Function to process and aggregate data for a single year
 def process_yearly_data(file_path, year):
     print(f"Processing {year} data from {file_path}")
-    data = pd.read_csv(file_path)
+    data = pv.read_csv(file_path, convert_options=convert_options).to_pandas()
     
     # Fill missing values
     data.fillna(fill_values, inplace=True)
+
+    # Whole-minute and whole-mile columns fit in narrow integer types once filled
+    data = data.astype({"DISTANCE": "int16", "TAXI_IN": "int16", "TAXI_OUT": "int16", "CANCELLED": "int8"})
     
-    # Convert date column to datetime
-    data['FL_DATE'] = pd.to_datetime(data['FL_DATE'])
-    data['Month'] = data['FL_DATE'].dt.to_period('M')
-    data['Hour'] = data['CRS_DEP_TIME'] // 100
+    # FL_DATE is parsed as a date by the CSV reader; truncate it to the first of the month
+    data['Month'] = data['FL_DATE'].values.astype('datetime64[M]')
+    data['Hour'] = (data['CRS_DEP_TIME'] // 100).astype('int8')
     
-    # Map state and geographic information to the flight data
-    data["ORIGIN_STATE"] = data["ORIGIN"].map(airports_dict["STATE"])
-    data["DEST_STATE"] = data["DEST"].map(airports_dict["STATE"])
-    data["LATITUDE"] = data["ORIGIN"].map(airports_dict["LATITUDE"])
-    data["LONGITUDE"] = data["ORIGIN"].map(airports_dict["LONGITUDE"])
+    # Low-cardinality string columns group and count much faster as categoricals
+    for col in ["OP_CARRIER", "ORIGIN", "DEST", "CANCELLATION_CODE"]:
+        data[col] = data[col].astype("category")
+
+    # Map states onto the flights; on categoricals only the few hundred airport codes are looked up, and no merge copies the frame
+    data["ORIGIN_STATE"] = data["ORIGIN"].map(state_by_iata).astype(state_dtype)
+    data["DEST_STATE"] = data["DEST"].map(state_by_iata).astype(state_dtype)
     
-    # Generate aggregated datasets
-    carrier_delays = data.groupby("OP_CARRIER")[
-        ["CARRIER_DELAY", "WEATHER_DELAY", "NAS_DELAY", "SECURITY_DELAY", "LATE_AIRCRAFT_DELAY"]
-    ].mean().reset_index()
+    # Generate aggregated datasets, computing every mean for a grouping key in one pass
+    # Delays are read as float32, but the means are written as float64 (and Hour as int64) like the stored datasets
+    delay_columns = ["CARRIER_DELAY", "WEATHER_DELAY", "NAS_DELAY", "SECURITY_DELAY", "LATE_AIRCRAFT_DELAY"]
+    carrier_agg = data.groupby("OP_CARRIER", observed=True)[
+        delay_columns + ["CANCELLED", "ARR_DELAY", "TAXI_IN", "TAXI_OUT"]
+    ].mean().astype("float64").reset_index()
+    hour_agg = data.groupby("Hour", observed=True)[["DEP_DELAY", "TAXI_IN", "TAXI_OUT"]].mean().astype("float64").reset_index()
+    hour_agg["Hour"] = hour_agg["Hour"].astype("int64")
+    origin_agg = data.groupby("ORIGIN", observed=True)[["DEP_DELAY", "ARR_DELAY"]].mean().astype("float64").reset_index()
 
-    monthly_aggregates = data.groupby('Month')[['DEP_DELAY', 'ARR_DELAY', 'CANCELLED']].mean().reset_index()
+    carrier_delays = carrier_agg[["OP_CARRIER"] + delay_columns]
 
-    state_flight_counts = data.groupby("ORIGIN_STATE").size().reset_index(name="Flight Count")
+    monthly_aggregates = data.groupby('Month', observed=True)[['DEP_DELAY', 'ARR_DELAY', 'CANCELLED']].mean().astype("float64").reset_index()
+
+    state_flight_counts = data.groupby("ORIGIN_STATE", observed=True).size().reset_index(name="Flight Count")
 
     # Map state information to the dataset for both origin and destination airports
-    origin_dest_counts = data.groupby(["ORIGIN", "DEST"]).size().reset_index(name="Flight Count")
+    origin_dest_counts = data.groupby(["ORIGIN", "DEST"], observed=True).size().reset_index(name="Flight Count")
 
-    # Map state information from the airports dictionary
-    origin_dest_counts["ORIGIN_STATE"] = origin_dest_counts["ORIGIN"].map(airports_dict["STATE"])
-    origin_dest_counts["DEST_STATE"] = origin_dest_counts["DEST"].map(airports_dict["STATE"])
+    # Join state information from the airport lookup tables
+    origin_dest_counts = origin_dest_counts.merge(
+        origin_lookup[["ORIGIN", "ORIGIN_STATE"]], on="ORIGIN", how="left"
+    ).merge(dest_lookup, on="DEST", how="left")
 
+    # Sunburst charts get explicit ids/parents/values so Plotly does not roll up the hierarchy at render time
+    sunburst_counts = origin_dest_counts.dropna(subset=["ORIGIN_STATE", "ORIGIN", "DEST_STATE", "DEST"])
+    sunburst_origin = build_sunburst(sunburst_counts, "ORIGIN_STATE", "ORIGIN")
+    sunburst_dest = build_sunburst(sunburst_counts, "DEST_STATE", "DEST")
 
-    airport_delays = data.groupby("ORIGIN")["DEP_DELAY"].mean().reset_index(name="Average Departure Delay")
+    airport_delays = origin_agg[["ORIGIN", "DEP_DELAY"]].rename(columns={"DEP_DELAY": "Average Departure Delay"})
 
-    daily_delay_trend = data.groupby(data['FL_DATE'].dt.date)['ARR_DELAY'].mean().reset_index(name="Average Arrival Delay")
+    daily_delay_trend = data.groupby('FL_DATE')['ARR_DELAY'].mean().astype("float64").reset_index(name="Average Arrival Delay")
 
     cancellation_reasons = data["CANCELLATION_CODE"].value_counts().reset_index()
     cancellation_reasons.columns = ["Reason", "Count"]
 
-    distance_vs_delay = data.groupby(["DISTANCE", "ARR_DELAY", "OP_CARRIER"]).size().reset_index(name="Count")
+    # Bin distance to 50 miles and arrival delay to 5 minutes; per-flight values would keep nearly every row
+    distance_bins = (data["DISTANCE"] // 50 * 50).astype("int16")
+    delay_bins = (data["ARR_DELAY"] // 5 * 5).astype("float64")
+    distance_vs_delay = data.groupby([distance_bins, delay_bins, "OP_CARRIER"], observed=True).size().reset_index(name="Count")
 
-    airport_bubble_map = data.groupby(['ORIGIN', 'LATITUDE', 'LONGITUDE'])['ARR_DELAY'].mean().reset_index(name="Average Arrival Delay")
+    # Origins without coordinates are left out of the bubble map
+    airport_bubble_map = origin_agg[["ORIGIN", "ARR_DELAY"]].merge(
+        origin_lookup[["ORIGIN", "LATITUDE", "LONGITUDE"]], on="ORIGIN"
+    ).dropna(subset=["LATITUDE", "LONGITUDE"])
+    airport_bubble_map = airport_bubble_map[["ORIGIN", "LATITUDE", "LONGITUDE", "ARR_DELAY"]].rename(
+        columns={"ARR_DELAY": "Average Arrival Delay"}
+    )
+    # The map sizes bubbles by delay, so airports that arrive early on average get a zero-size bubble
+    airport_bubble_map["Average Arrival Delay"] = airport_bubble_map["Average Arrival Delay"].clip(lower=0)
+    # Origins whose flights were all cancelled or diverted have no mean delay and cannot size a bubble
+    airport_bubble_map = airport_bubble_map.dropna(subset=["Average Arrival Delay"])
 
-    departure_delay_by_hour = data.groupby("Hour")["DEP_DELAY"].mean().reset_index(name="Average Departure Delay")
+    departure_delay_by_hour = hour_agg[["Hour", "DEP_DELAY"]].rename(columns={"DEP_DELAY": "Average Departure Delay"})
 
-    cancellation_percentage_by_carrier = data.groupby("OP_CARRIER")["CANCELLED"].mean().reset_index(name="Cancellation Rate")
+    cancellation_percentage_by_carrier = carrier_agg[["OP_CARRIER", "CANCELLED"]].rename(columns={"CANCELLED": "Cancellation Rate"})
 
-    airlines_most_delays = data.groupby("OP_CARRIER")["ARR_DELAY"].mean().reset_index().sort_values("ARR_DELAY", ascending=False)
+    airlines_most_delays = carrier_agg[["OP_CARRIER", "ARR_DELAY"]].sort_values("ARR_DELAY", ascending=False)
 
-    taxi_times = data.groupby("OP_CARRIER")[["TAXI_IN", "TAXI_OUT"]].mean().reset_index()
-    taxi_hourly = data.groupby("Hour")[["TAXI_IN", "TAXI_OUT"]].mean().reset_index()
+    taxi_times = carrier_agg[["OP_CARRIER", "TAXI_IN", "TAXI_OUT"]]
+    taxi_hourly = hour_agg[["Hour", "TAXI_IN", "TAXI_OUT"]]
 
     state_airport_count = airports.groupby("STATE").size().reset_index(name="Airport Count")
 
-    origin_state_data = data["ORIGIN_STATE"].value_counts().reset_index()
-    origin_state_data.columns = ["State", "Origin Count"]
-    origin_state_data = origin_state_data.merge(state_airport_count, left_on="State", right_on="STATE", how="left")
+    # Flight counts per state with that state's airport count alongside
+    state_airports = state_airport_count.rename(columns={"STATE": "State"})
+    # Both are derived from counts already taken above instead of grouping the flight rows again
+    origin_state_data = state_flight_counts.rename(columns={"Flight Count": "Origin Count"})
+    origin_state_data = origin_state_data.rename(columns={"ORIGIN_STATE": "State"}).merge(state_airports, on="State", how="left")
 
-    destination_state_data = data["DEST_STATE"].value_counts().reset_index()
-    destination_state_data.columns = ["State", "Destination Count"]
-    destination_state_data = destination_state_data.merge(state_airport_count, left_on="State", right_on="STATE", how="left")
+    destination_state_data = origin_dest_counts.groupby("DEST_STATE", observed=True)["Flight Count"].sum().reset_index(name="Destination Count")
+    destination_state_data = destination_state_data.rename(columns={"DEST_STATE": "State"}).merge(state_airports, on="State", how="left")
 
     # Define all datasets to be saved
     all_datasets = {
@@ -95,6 +187,8 @@ def process_yearly_data(file_path, year):
         "monthly_aggregates": monthly_aggregates,
         "state_flight_counts": state_flight_counts,
         "origin_dest_counts": origin_dest_counts,
+        "sunburst_origin": sunburst_origin,
+        "sunburst_dest": sunburst_dest,
         "airport_delays": airport_delays,
         "daily_delay_trend": daily_delay_trend,
         "cancellation_reasons": cancellation_reasons,
@@ -110,19 +204,41 @@ def process_yearly_data(file_path, year):
         "taxi_hourly": taxi_hourly
     }
     
-    # Create the output directory for the year
-    output_dir = os.path.join(output_base_dir, str(year))
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Save all datasets to CSV files
-    for name, df in all_datasets.items():
-        output_path = os.path.join(output_dir, f"{name}.csv")
-        df.to_csv(output_path, index=False)
+    return all_datasets
+
+# Write each aggregate as one dataset partitioned by year (datasets/AGG_Datasets/<name>/year=<year>/)
+def write_datasets(yearly_results):
+    if not yearly_results:
+        print(f"No yearly CSV files found in {input_dir}; nothing to write")
+        return
+    for name in yearly_results[0][1]:
+        combined = pd.concat(
+            [datasets[name].assign(year=int(year)) for year, datasets in yearly_results],
+            ignore_index=True
+        )
+        output_path = os.path.join(output_base_dir, name)
+        ds.write_dataset(
+            pa.Table.from_pandas(combined, preserve_index=False),
+            output_path,
+            format="parquet",
+            partitioning=["year"],
+            partitioning_flavor="hive",
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="delete_matching",
+            use_threads=False  # Keep row order, e.g. airlines_most_delays is sorted by delay
+        )
         print(f"Saved {name} to {output_path}")
 
-# Process each file in the input directory
-for file_name in os.listdir(input_dir):
-    if file_name.endswith(".csv"):
-        year = file_name.split('.')[0]  # Extract the year from the file name
-        file_path = os.path.join(input_dir, file_name)
-        process_yearly_data(file_path, year)
\ No newline at end of file
+# Process each file in the input directory, one worker process per year
+if __name__ == "__main__":
+    file_paths, years = [], []
+    for file_name in os.listdir(input_dir):
+        if file_name.endswith(".csv"):
+            years.append(file_name.split('.')[0])  # Extract the year from the file name
+            file_paths.append(os.path.join(input_dir, file_name))
+
+    # Workers share the module-level airport lookup tables and only send back the small aggregates
+    with ProcessPoolExecutor() as executor:
+        yearly_results = list(zip(years, executor.map(process_yearly_data, file_paths, years)))
+
+    write_datasets(yearly_results)